@@ -8,10 +8,120 @@ Generates 7-day sufficiency assessments
 """
 
 import json
-import pandas as pd
 import numpy as np
+from bisect import bisect_right
 from datetime import datetime
+from functools import cached_property
 from typing import Dict, List, Tuple
+from numba import njit
+
+# Occupancy band edges (%) and the status each band maps to
+SUFFICIENCY_THRESHOLDS = (15.0, 30.0, 50.0)
+SUFFICIENCY_STATUS = ('CRITICAL', 'WARNING', 'CAUTION', 'SAFE')
+_SUFFICIENCY_THRESHOLDS_ARR = np.array(SUFFICIENCY_THRESHOLDS)
+
+
+# Action templates per occupancy band:
+# (action, description, impact, urgency, priority, confidence delta)
+_CRITICAL_ACTIONS = (
+    ('pressure_reduction', 'Reduce city-wide water pressure by 10%',
+     '10% consumption reduction', 'IMMEDIATE', 1, +8),           # High certainty
+    ('partial_cut_5', 'Implement 5% water cuts in non-essential areas',
+     '5% consumption reduction', 'IMMEDIATE', 2, +5),
+    ('non_essential_ban', 'Ban non-essential water use (car wash, gardens)',
+     '12% consumption reduction', 'IMMEDIATE', 3, -5),
+    ('public_campaign', 'Emergency public awareness campaign',
+     '6% reduction via voluntary conservation', 'IMMEDIATE', 4, -15),  # Low confidence
+)
+
+_WARNING_ACTIONS = (
+    ('leak_repair', 'Accelerate leak detection and repair campaign',
+     '5% reduction via infrastructure improvement', 'HIGH', 1, -8),
+    ('peak_pricing', 'Implement peak-hour pricing surge (2x rate)',
+     '8% reduction during peak hours', 'HIGH', 2, -10),
+    ('partial_cut_3', 'Prepare 3% partial cuts in specific areas',
+     '3% targeted reduction', 'HIGH', 3, +3),
+    ('public_campaign', 'Activate water conservation messaging',
+     '6% reduction via awareness', 'MEDIUM', 4, -20),
+)
+
+_CAUTION_ACTIONS = (
+    ('leak_repair', 'Regular leak repair and maintenance',
+     '5% reduction via infrastructure', 'MEDIUM', 1, -5),
+    ('public_campaign', 'Water conservation awareness program',
+     '6% reduction via voluntary conservation', 'MEDIUM', 2, -15),
+)
+
+_SAFE_ACTIONS = (
+    ('monitoring', 'Continue routine monitoring',
+     'No restrictions needed', 'ROUTINE', 1, 0),
+)
+
+# Indexed like SUFFICIENCY_STATUS
+_ACTION_TEMPLATES = (_CRITICAL_ACTIONS, _WARNING_ACTIONS, _CAUTION_ACTIONS, _SAFE_ACTIONS)
+
+
+# Shared by every kernel: on-disk JIT cache, relaxed FP, no Python-style error checks
+_JIT_OPTIONS = dict(cache=True, fastmath=True, error_model='numpy', boundscheck=False)
+
+
+@njit(**_JIT_OPTIONS)
+def _sufficiency_core(occupancy_pct, predicted_monthly_consumption, precipitation_forecast):
+    """
+    Numeric core of calculate_sufficiency_score
+
+    Returns:
+        (days_until_crisis, confidence, status_code, available_pct, net_available_pct)
+        where status_code indexes SUFFICIENCY_STATUS
+    """
+    daily_consumption = predicted_monthly_consumption / 30
+    available_pct = max(occupancy_pct - 5.0, 0.0)
+    net_available_pct = available_pct + (precipitation_forecast * 0.5)
+    daily_loss_pct = (daily_consumption / 30) * 0.001
+
+    if daily_loss_pct > 0:
+        days_until_crisis = net_available_pct / (daily_loss_pct * 100)
+    else:
+        days_until_crisis = 999.0
+
+    model_confidence = min(90.0, 50 + (occupancy_pct * 0.4))
+    forecast_confidence = 70.0 if precipitation_forecast > 0 else 85.0
+    confidence = (model_confidence + forecast_confidence) / 2
+
+    status_code = np.searchsorted(_SUFFICIENCY_THRESHOLDS_ARR, occupancy_pct, side='right')
+    if status_code == 0:
+        confidence = min(confidence, 95.0)
+
+    return (max(0.0, days_until_crisis), min(100.0, confidence), status_code,
+            available_pct, net_available_pct)
+
+
+# Serial on purpose: a few dozen rows take microseconds, and a parallel kernel would start
+# Numba's threading layer in whichever worker thread calls it, hanging the process at exit
+@njit(**_JIT_OPTIONS)
+def _sufficiency_batch(occ_arr, cons_arr, precip_arr):
+    """Apply _sufficiency_core over arrays of districts"""
+    n = occ_arr.shape[0]
+    days = np.empty(n)
+    confidence = np.empty(n)
+    status = np.empty(n, dtype=np.int64)
+    available = np.empty(n)
+    net_available = np.empty(n)
+    for i in range(n):
+        d, c, s, a, na = _sufficiency_core(occ_arr[i], cons_arr[i], precip_arr[i])
+        days[i] = d
+        confidence[i] = c
+        status[i] = s
+        available[i] = a
+        net_available[i] = na
+    return days, confidence, status, available, net_available
+
+
+def warmup_kernels():
+    """Compile the Numba kernels for the float64 signatures the API uses"""
+    _sufficiency_core(50.0, 1e6, 0.0)
+    _sufficiency_batch(np.full(1, 50.0), np.full(1, 1e6), np.zeros(1))
+
 
 class ActionRulesEngine:
     """Decision rules for water management actions based on occupancy"""
@@ -24,7 +134,13 @@ class ActionRulesEngine:
         """
         self.district_to_dams = district_to_dams
         self.dam_stats = dam_stats
-        self.total_capacity = sum(d['capacity_m3'] for d in dam_stats.values())
+        
+        # Per-district connected dam names and their capacity vector
+        self._district_cache = {}
+        for district, dams in district_to_dams.items():
+            names = [d for d in dams if d in dam_stats]
+            caps = np.asarray([dam_stats[d]['capacity_m3'] for d in names], dtype=np.float64)
+            self._district_cache[district] = (names, caps, caps.sum())
         
         # Historical accuracy of actions (from 2015-2021 analysis)
         self.action_effectiveness = {
@@ -38,6 +154,11 @@ class ActionRulesEngine:
             'full_cut': {'saving': 100, 'accuracy': 100},              # 100% cut, 100% accuracy
         }
     
+    @cached_property
+    def total_capacity(self) -> float:
+        """Combined capacity of all dams (m³)"""
+        return sum(d['capacity_m3'] for d in self.dam_stats.values())
+    
     def get_district_occupancy(self, district: str, 
                                district_dam_occupancy: Dict[str, float]) -> float:
         """
@@ -50,25 +171,22 @@ class ActionRulesEngine:
         Returns:
             Weighted occupancy percentage
         """
-        if district not in self.district_to_dams:
+        if district not in self._district_cache:
             return 0.0
         
-        connected_dams = self.district_to_dams[district]
-        available_dams = [d for d in connected_dams if d in district_dam_occupancy]
+        names, caps, cap_sum = self._district_cache[district]
+        occ = np.fromiter(
+            (district_dam_occupancy.get(d, np.nan) for d in names),
+            dtype=np.float64, count=len(names)
+        )
         
-        if not available_dams:
+        # Capacity-weighted average over the dams we have readings for
+        available = ~np.isnan(occ)
+        if available.all():
+            return float(np.dot(occ, caps) / cap_sum) if cap_sum else 0.0
+        if not available.any():
             return 0.0
-        
-        # Capacity-weighted average
-        weights = [self.dam_stats[d]['capacity_m3'] for d in available_dams]
-        total_weight = sum(weights)
-        
-        weighted_occ = sum(
-            district_dam_occupancy[d] * self.dam_stats[d]['capacity_m3'] 
-            for d in available_dams
-        ) / total_weight
-        
-        return weighted_occ
+        return float(np.dot(occ[available], caps[available]) / caps[available].sum())
     
     def calculate_sufficiency_score(self, 
                                    occupancy_pct: float,
@@ -91,58 +209,62 @@ class ActionRulesEngine:
                 'status': 'SAFE' | 'WARNING' | 'CRITICAL'
             }
         """
-        # Convert to daily consumption from monthly prediction
-        daily_consumption = predicted_monthly_consumption / 30
-        
-        # Calculate available water (percentage points)
-        safe_margin_pct = 5.0
-        available_pct = max(occupancy_pct - safe_margin_pct, 0)
-        
-        # Account for incoming precipitation (improves situation)
-        net_available_pct = available_pct + (precipitation_forecast * 0.5) # 50% efficiency
-        
-        # Estimate daily loss as percentage of capacity
-        daily_loss_pct = (daily_consumption / 30) * 0.001
-        
-        # Days until crisis = available % / daily loss %
-        if daily_loss_pct > 0:
-            days_until_crisis = net_available_pct / (daily_loss_pct * 100) if daily_loss_pct > 0 else 999
-        else:
-            days_until_crisis = 999
-        
-        # Confidence based on forecast accuracy
-        # Model uncertainty: higher occupancy = more accurate predictions
-        model_confidence = min(90, 50 + (occupancy_pct * 0.4))
-        
-        # Precipitation forecast uncertainty (we don't have real forecasts)
-        if precipitation_forecast > 0:
-            forecast_confidence = 70  # Medium confidence
-        else:
-            forecast_confidence = 85  # Higher confidence in dry forecast
-        
-        confidence = (model_confidence + forecast_confidence) / 2
-        
-        # Status determination
-        if occupancy_pct < 15:
-            status = 'CRITICAL'
-            confidence = min(confidence, 95)
-        elif occupancy_pct < 30:
-            status = 'WARNING'
-        elif occupancy_pct < 50:
-            status = 'CAUTION'
-        else:
-            status = 'SAFE'
+        days_until_crisis, confidence, status_code, available_pct, net_available_pct = \
+            _sufficiency_core(float(occupancy_pct),
+                              float(predicted_monthly_consumption),
+                              float(precipitation_forecast))
         
         return {
-            'days_until_crisis': max(0, days_until_crisis),
-            'confidence': min(100, confidence),
-            'status': status,
+            'days_until_crisis': days_until_crisis,
+            'confidence': confidence,
+            'status': SUFFICIENCY_STATUS[status_code],
             'occupancy_pct': occupancy_pct,
             'available_pct': available_pct,
             'net_available_pct': net_available_pct,
-            'daily_consumption': daily_consumption
+            'daily_consumption': predicted_monthly_consumption / 30
         }
     
+    def calculate_sufficiency_batch(self,
+                                    occupancies: List[float],
+                                    predicted_consumptions: List[float],
+                                    precipitation_forecasts: List[float] = None) -> List[Dict]:
+        """
+        Vectorized calculate_sufficiency_score over many districts
+        
+        Args:
+            occupancies: Occupancy percentage per district
+            predicted_consumptions: Expected monthly consumption per district (m³)
+            precipitation_forecasts: Expected inflow per district (defaults to 0.0)
+            
+        Returns:
+            List of sufficiency dicts, same shape as calculate_sufficiency_score()
+        """
+        occ_arr = np.asarray(occupancies, dtype=np.float64)
+        cons_arr = np.asarray(predicted_consumptions, dtype=np.float64)
+        if precipitation_forecasts is None:
+            precip_arr = np.zeros_like(occ_arr)
+        else:
+            precip_arr = np.asarray(precipitation_forecasts, dtype=np.float64)
+        
+        days, confidence, status, available, net_available = \
+            _sufficiency_batch(occ_arr, cons_arr, precip_arr)
+        
+        return [
+            {
+                'days_until_crisis': d,
+                'confidence': c,
+                'status': SUFFICIENCY_STATUS[st],
+                'occupancy_pct': occ,
+                'available_pct': a,
+                'net_available_pct': na,
+                'daily_consumption': cons / 30
+            }
+            for d, c, st, occ, a, na, cons in zip(
+                days.tolist(), confidence.tolist(), status.tolist(), occupancies,
+                available.tolist(), net_available.tolist(), predicted_consumptions
+            )
+        ]
+    
     def generate_actions(self, sufficiency: Dict) -> List[Dict]:
         """
         Generate recommended actions based on sufficiency score
@@ -153,131 +275,31 @@ class ActionRulesEngine:
         Returns:
             List of action recommendations with confidence levels
         """
-        actions = []
         occupancy = sufficiency['occupancy_pct']
-        days_until_crisis = sufficiency['days_until_crisis']
         base_confidence = sufficiency['confidence']
         
-        # CRITICAL: < 15% occupancy
-        if occupancy < 15:
-            actions = [
-                {
-                    'action': 'pressure_reduction',
-                    'description': 'Reduce city-wide water pressure by 10%',
-                    'impact': '10% consumption reduction',
-                    'confidence': min(100, base_confidence + 8),  # High certainty
-                    'urgency': 'IMMEDIATE',
-                    'priority': 1
-                },
-                {
-                    'action': 'partial_cut_5',
-                    'description': 'Implement 5% water cuts in non-essential areas',
-                    'impact': '5% consumption reduction',
-                    'confidence': min(100, base_confidence + 5),
-                    'urgency': 'IMMEDIATE',
-                    'priority': 2
-                },
-                {
-                    'action': 'non_essential_ban',
-                    'description': 'Ban non-essential water use (car wash, gardens)',
-                    'impact': '12% consumption reduction',
-                    'confidence': base_confidence - 5,
-                    'urgency': 'IMMEDIATE',
-                    'priority': 3
-                },
-                {
-                    'action': 'public_campaign',
-                    'description': 'Emergency public awareness campaign',
-                    'impact': '6% reduction via voluntary conservation',
-                    'confidence': base_confidence - 15,  # Low confidence
-                    'urgency': 'IMMEDIATE',
-                    'priority': 4
-                }
-            ]
-        
-        # WARNING: 15-30% occupancy
-        elif occupancy < 30:
-            actions = [
-                {
-                    'action': 'leak_repair',
-                    'description': 'Accelerate leak detection and repair campaign',
-                    'impact': '5% reduction via infrastructure improvement',
-                    'confidence': base_confidence - 8,
-                    'urgency': 'HIGH',
-                    'priority': 1
-                },
-                {
-                    'action': 'peak_pricing',
-                    'description': 'Implement peak-hour pricing surge (2x rate)',
-                    'impact': '8% reduction during peak hours',
-                    'confidence': base_confidence - 10,
-                    'urgency': 'HIGH',
-                    'priority': 2
-                },
-                {
-                    'action': 'partial_cut_3',
-                    'description': 'Prepare 3% partial cuts in specific areas',
-                    'impact': '3% targeted reduction',
-                    'confidence': base_confidence + 3,
-                    'urgency': 'HIGH',
-                    'priority': 3
-                },
-                {
-                    'action': 'public_campaign',
-                    'description': 'Activate water conservation messaging',
-                    'impact': '6% reduction via awareness',
-                    'confidence': base_confidence - 20,
-                    'urgency': 'MEDIUM',
-                    'priority': 4
-                }
-            ]
-        
-        # CAUTION: 30-50% occupancy
-        elif occupancy < 50:
-            actions = [
-                {
-                    'action': 'leak_repair',
-                    'description': 'Regular leak repair and maintenance',
-                    'impact': '5% reduction via infrastructure',
-                    'confidence': base_confidence - 5,
-                    'urgency': 'MEDIUM',
-                    'priority': 1
-                },
-                {
-                    'action': 'public_campaign',
-                    'description': 'Water conservation awareness program',
-                    'impact': '6% reduction via voluntary conservation',
-                    'confidence': base_confidence - 15,
-                    'urgency': 'MEDIUM',
-                    'priority': 2
-                }
-            ]
-        
-        # SAFE: > 50% occupancy
-        else:
-            actions = [
-                {
-                    'action': 'monitoring',
-                    'description': 'Continue routine monitoring',
-                    'impact': 'No restrictions needed',
-                    'confidence': base_confidence,
-                    'urgency': 'ROUTINE',
-                    'priority': 1
-                }
-            ]
+        templates = _ACTION_TEMPLATES[bisect_right(SUFFICIENCY_THRESHOLDS, occupancy)]
         
         # Clamp confidence to 0-100
-        for action in actions:
-            action['confidence'] = min(100, max(0, action['confidence']))
-        
-        return actions
+        return [
+            {
+                'action': action,
+                'description': description,
+                'impact': impact,
+                'confidence': min(100, max(0, base_confidence + delta)),
+                'urgency': urgency,
+                'priority': priority
+            }
+            for action, description, impact, urgency, priority, delta in templates
+        ]
     
     def generate_district_assessment(self, 
                                     district: str,
                                     current_occupancy: float,
                                     predicted_consumption: float,
                                     precipitation_forecast: float = 0.0,
-                                    district_dam_stats: Dict = None) -> Dict:
+                                    district_dam_stats: Dict = None,
+                                    assessment_date: str = None) -> Dict:
         """
         Generate complete assessment for a district
         
@@ -287,17 +309,55 @@ class ActionRulesEngine:
             predicted_consumption: Expected consumption this month (m³)
             precipitation_forecast: Expected inflow next week (%)
             district_dam_stats: Optional dict of specific dam stats for this district
+            assessment_date: ISO timestamp to stamp on the result
+                             (defaults to when the assessment was computed)
             
         Returns:
             Complete assessment with sufficiency score and recommended actions
         """
-        # Calculate sufficiency
         sufficiency = self.calculate_sufficiency_score(
             current_occupancy,
             predicted_consumption,
             precipitation_forecast
         )
+        if assessment_date is None:
+            assessment_date = datetime.now().isoformat()
+        return self._build_assessment(district, sufficiency, assessment_date)
+    
+    def generate_district_assessments(self,
+                                      districts: List[str],
+                                      occupancies: List[float],
+                                      predicted_consumptions: List[float],
+                                      precipitation_forecasts: List[float] = None,
+                                      assessment_date: str = None) -> List[Dict]:
+        """
+        Generate assessments for many districts with one batched sufficiency pass
         
+        Args:
+            districts: District names
+            occupancies: Current occupancy % per district
+            predicted_consumptions: Expected consumption this month per district (m³)
+            precipitation_forecasts: Expected inflow next week per district (%)
+            assessment_date: ISO timestamp shared by every result
+                             (defaults to when the batch was computed)
+            
+        Returns:
+            List of assessments, same shape as generate_district_assessment()
+        """
+        sufficiencies = self.calculate_sufficiency_batch(
+            occupancies,
+            predicted_consumptions,
+            precipitation_forecasts
+        )
+        if assessment_date is None:
+            assessment_date = datetime.now().isoformat()
+        return [
+            self._build_assessment(district, sufficiency, assessment_date)
+            for district, sufficiency in zip(districts, sufficiencies)
+        ]
+    
+    def _build_assessment(self, district: str, sufficiency: Dict, assessment_date: str) -> Dict:
+        """Attach actions and connected dam info to a sufficiency score"""
         # Generate actions
         actions = self.generate_actions(sufficiency)
         
@@ -316,7 +376,7 @@ class ActionRulesEngine:
         
         return {
             'district': district,
-            'assessment_date': datetime.now().isoformat(),
+            'assessment_date': assessment_date,
             'sufficiency': sufficiency,
             'recommended_actions': actions,
             'connected_dams': dams_info,
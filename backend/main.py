@@ -1,29 +1,70 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
 from contextlib import asynccontextmanager
+from functools import lru_cache
+from bisect import bisect_right
 from pathlib import Path
-import json
+import asyncio
+import hashlib
+import orjson
+import numpy as np
+from scipy import sparse
 import uvicorn
-from datetime import datetime, timedelta
+from datetime import datetime
 
 # Import the Real Engine
 from predict_weekly_v2 import RealPredictionEngine
-from action_rules_v1 import ActionRulesEngine
+from action_rules_v1 import ActionRulesEngine, warmup_kernels
 
 # --- CONFIGURATION ---
 ALERT_THRESHOLD = 40.0
 CRITICAL_THRESHOLD = 18.0
 
+# Threshold edges are ascending; bucket index selects from STATUS_LABELS
+STATUS_LABELS = ("CRITICAL", "WARNING", "CAUTION", "SAFE")
+DAM_THRESHOLDS = (CRITICAL_THRESHOLD, ALERT_THRESHOLD, 60.0)
+SUPPLY_DAY_THRESHOLDS = (30.0, 90.0, 180.0)
+_STATUS_LABELS_ARR = np.array(STATUS_LABELS)
+
 # --- GLOBAL SINGLETONS ---
 ml_engine = None
 rules_engine = None
 district_drivers = {}
+district_names = []
+district_dam_matrix = None
+district_num_sources = None
+district_supply_m3 = None
+district_source_dams = []
+_dams_cache = {"month": None, "body": None, "etag": None}
+_districts_cache = {"month": None, "body": None, "etag": None}
+_forecast_cache = {"date": None, "body": None}
 ROOT_DIR = Path(__file__).parent.parent
 
+# --- RESPONSE CLASS ---
+class ORJSONResponse(JSONResponse):
+    # fastapi.responses.ORJSONResponse is deprecated upstream; same render, numpy-aware
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY)
+
+def cached_json_response(cache, request, build):
+    """Serve build() as pre-serialized bytes, rebuilt once per model month (or reload), with ETag revalidation"""
+    month = datetime.now().month
+    if cache["month"] != month:
+        body = orjson.dumps(build(), option=orjson.OPT_SERIALIZE_NUMPY)
+        etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+        cache.update(month=month, body=body, etag=etag)
+    headers = {"ETag": cache["etag"], "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == cache["etag"]:
+        return Response(status_code=304, headers=headers)
+    return Response(cache["body"], media_type="application/json", headers=headers)
+
 # --- LIFESPAN HANDLER ---
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     global ml_engine, rules_engine, district_drivers
+    global district_names, district_dam_matrix, district_num_sources
+    global district_supply_m3, district_source_dams
     try:
         print("🔄 Initializing ML Engine...")
         ml_engine = RealPredictionEngine(models_dir=str(ROOT_DIR / 'models'))
@@ -33,17 +74,49 @@ async def lifespan(app: FastAPI):
         )
         print("✅ ML Engine & Rules Engine Loaded Successfully")
 
+        # Pay the JIT compile cost at boot, not on the first request
+        warmup_kernels()
+
+        _dams_cache["month"] = None
+        _districts_cache["month"] = None
+        _forecast_cache["date"] = None
+        _dam_detail.cache_clear()
+
+        # --- INCIDENCE MATRIX (DISTRICT x DAM) ---
+        district_names = list(ml_engine.district_mapping.keys())
+        dam_idx = ml_engine.dams.index
+        rows, cols = [], []
+        for i, dist in enumerate(district_names):
+            for dn in ml_engine.district_to_dams.get(dist, []):
+                if dn in dam_idx:
+                    rows.append(i)
+                    cols.append(dam_idx[dn])
+        district_dam_matrix = sparse.csr_matrix(
+            (np.ones(len(rows)), (rows, cols)), shape=(len(district_names), len(ml_engine.dams))
+        )
+        district_num_sources = np.array(
+            [ml_engine.district_source_count.get(d, 0) for d in district_names], dtype=np.float64
+        )
+
+        # Supply share and source list only depend on dam_stats; build once per load
+        dams = ml_engine.dams
+        district_supply_m3 = (district_dam_matrix @ (dams.volume * 0.95)) / np.maximum(1, district_num_sources * 2)
+        dam_status = dict(zip(dams.names, get_dam_status_vec(dams.occupancy).tolist()))
+        district_source_dams = [
+            [{"name": dam, "status": dam_status[dam]} for dam in ml_engine.district_to_dams.get(dist, []) if dam in dam_status]
+            for dist in district_names
+        ]
+
         # --- LOAD DRIVERS FROM JSON ---
         try:
             drivers_path = ROOT_DIR / 'data' / 'ilceler_kullanimlar.json'
             if drivers_path.exists():
-                with open(drivers_path, 'r', encoding='utf-8') as f:
-                    raw_drivers = json.load(f)
-                    for item in raw_drivers:
-                        d_name = item.get('district_name')
-                        d_driver = item.get('primary_driver')
-                        if d_name and d_driver:
-                            district_drivers[d_name] = d_driver
+                raw_drivers = orjson.loads(await asyncio.to_thread(drivers_path.read_bytes))
+                for item in raw_drivers:
+                    d_name = item.get('district_name')
+                    d_driver = item.get('primary_driver')
+                    if d_name and d_driver:
+                        district_drivers[d_name] = d_driver
                 print(f"✅ Loaded drivers for {len(district_drivers)} districts")
             else:
                 print(f"⚠️ Drivers file not found at: {drivers_path}")
@@ -56,7 +129,10 @@ async def lifespan(app: FastAPI):
     print("🛑 Shutting down ML Engine...")
 
 # Initialize App
-app = FastAPI(title="Istanbul Water Management API", version="13.0 (Drivers Fixed)", lifespan=lifespan)
+app = FastAPI(
+    title="Istanbul Water Management API", version="13.0 (Drivers Fixed)",
+    lifespan=lifespan, default_response_class=ORJSONResponse
+)
 
 app.add_middleware(
     CORSMiddleware,
@@ -68,60 +144,81 @@ app.add_middleware(
 
 # --- LOGIC HELPERS ---
 def get_dam_status(occupancy):
-    if occupancy < CRITICAL_THRESHOLD: return "CRITICAL"
-    elif occupancy < ALERT_THRESHOLD: return "WARNING"
-    elif occupancy < 60: return "CAUTION"
-    else: return "SAFE"
+    return STATUS_LABELS[bisect_right(DAM_THRESHOLDS, occupancy)]
+
+def get_dam_status_vec(occupancy_arr):
+    return _STATUS_LABELS_ARR[np.searchsorted(DAM_THRESHOLDS, occupancy_arr, side='right')]
 
-def calculate_depletion(dam_name, current_occupancy_pct, capacity_m3):
+def get_supply_status_vec(days_supply_arr):
+    return _STATUS_LABELS_ARR[np.searchsorted(SUPPLY_DAY_THRESHOLDS, days_supply_arr, side='right')]
+
+def calculate_depletion(dam_name):
     if not ml_engine: return 0, 0, 0
-    daily_outflow_m3 = ml_engine.get_dam_daily_outflow(dam_name)
-    current_volume = capacity_m3 * (current_occupancy_pct / 100.0)
-    dead_volume = capacity_m3 * 0.03
-    usable_volume = max(0, current_volume - dead_volume)
+    idx = ml_engine.dams.index[dam_name]
+    daily_outflow_m3 = float(ml_engine.get_dam_daily_outflows()[idx])
+    usable_volume = max(0, float(ml_engine.dams.usable[idx]))
     
     if daily_outflow_m3 <= 0: days_to_crisis = 999
     else: days_to_crisis = usable_volume / daily_outflow_m3
         
     return daily_outflow_m3, usable_volume, days_to_crisis
 
+def project_reduction(daily_out_base, usable, capacity_m3, days_base, savings_pct):
+    # Constant-rate depletion, so the 30-day effect of a cut is closed form
+    daily_out = daily_out_base * (1 - savings_pct)
+    vol_saved = (daily_out_base - daily_out) * 30
+    return {
+        "days_gained": round(usable / daily_out - days_base, 1),
+        "retention_30d": round((vol_saved / capacity_m3) * 100, 2),
+        "vol_saved_m3": round(vol_saved),
+    }
+
+def calculate_depletion_vec(usable_arr, outflow_arr):
+    usable = np.maximum(0, usable_arr)
+    days_to_crisis = np.where(outflow_arr > 0, usable / np.maximum(outflow_arr, 1e-9), 999.0)
+    return usable, days_to_crisis
+
 # --- ENDPOINTS ---
 @app.get("/api/dams")
-async def get_all_dams():
+def get_all_dams(request: Request):
     if not ml_engine: return {"dams": [], "general_occupancy_pct": 0}
-    dams_list = []
-    total_sys_vol = 0
-    total_sys_cap = 0
-    for name, stats in ml_engine.dam_stats.items():
-        occ = stats['occupancy_pct']
-        cap = stats['capacity_m3']
-        daily_out, usable, days = calculate_depletion(name, occ, cap)
-        
-        conn_count = 0
-        for d_list in ml_engine.district_to_dams.values():
-            if name in d_list: conn_count += 1
-            
-        dams_list.append({
-            "name": name, "occupancy_pct": occ, "capacity_m3": cap,
-            "volume_m3": cap * (occ/100), "status": get_dam_status(occ),
-            "connected_districts_count": conn_count, "days_to_crisis": round(days)
-        })
-        total_sys_vol += (cap * (occ/100))
-        total_sys_cap += cap
+    # dam_stats is static after load; only the model's month changes the outflow
+    return cached_json_response(_dams_cache, request, _build_dams_payload)
+
+def _build_dams_payload():
+    dams = ml_engine.dams
+    _, days = calculate_depletion_vec(dams.usable, ml_engine.get_dam_daily_outflows())
+    statuses = get_dam_status_vec(dams.occupancy).tolist()
+    days_int = np.round(days).astype(int).tolist()
+    conn_counts = ml_engine.dam_connected_counts.tolist()
+    dams_list = [
+        {
+            "name": name, "occupancy_pct": stats['occupancy_pct'], "capacity_m3": stats['capacity_m3'],
+            "volume_m3": stats['volume_m3'], "status": status,
+            "connected_districts_count": conn_count, "days_to_crisis": d
+        }
+        for (name, stats), status, conn_count, d in zip(ml_engine.dam_stats.items(), statuses, conn_counts, days_int)
+    ]
+    total_sys_vol = float(dams.volume.sum())
+    total_sys_cap = float(dams.capacity.sum())
     gen_occ = (total_sys_vol / total_sys_cap * 100) if total_sys_cap > 0 else 0
     return {"dams": dams_list, "general_occupancy_pct": round(gen_occ, 2)}
 
 @app.get("/api/dam/{dam_name}")
-async def get_dam_detail(dam_name: str):
+def get_dam_detail(dam_name: str):
     if not ml_engine or dam_name not in ml_engine.dam_stats:
         raise HTTPException(status_code=404, detail="Dam not found")
-    
+    return _dam_detail(dam_name, datetime.now().month)
+
+# Detail depends only on static dam_stats and the model's month; cleared on reload
+@lru_cache(maxsize=None)
+def _dam_detail(dam_name, month):
     stats = ml_engine.dam_stats[dam_name]
     occ = stats['occupancy_pct']
     cap = stats['capacity_m3']
     status = get_dam_status(occ)
     
-    daily_out_base, usable, days_base = calculate_depletion(dam_name, occ, cap)
+    daily_out_base, usable, days_base = calculate_depletion(dam_name)
     
     recs = []
 
@@ -145,10 +242,6 @@ async def get_dam_detail(dam_name: str):
     })
 
     if status == "CRITICAL":
-        savings_pct_cut = 0.35 
-        daily_out_cut = daily_out_base * (1 - savings_pct_cut)
-        days_cut = usable / daily_out_cut
-        vol_saved_cut = (daily_out_base - daily_out_cut) * 30
         recs.append({
             "action": "PLANNED_CUTS_12H",
             "title": "ZORUNLU SU KESİNTİSİ",
@@ -156,17 +249,11 @@ async def get_dam_detail(dam_name: str):
             "priority": "CRITICAL",
             "details": {
                 "duration": "Her Gün (12 Saat)",
-                "days_gained": round(days_cut - days_base, 1),
-                "retention_30d": round((vol_saved_cut / cap) * 100, 2),
-                "vol_saved_m3": round(vol_saved_cut),
+                **project_reduction(daily_out_base, usable, cap, days_base, 0.35),
                 "risk_label": "⚠️ Çok Yüksek Tepki Riski"
             }
         })
 
-        savings_pct_pr = 0.12
-        daily_out_pr = daily_out_base * (1 - savings_pct_pr)
-        days_pr = usable / daily_out_pr
-        vol_saved_pr = (daily_out_base - daily_out_pr) * 30
         recs.append({
             "action": "PRESSURE_REDUCTION_HIGH",
             "title": "YÜKSEK BASINÇ KISITLAMASI",
@@ -174,18 +261,12 @@ async def get_dam_detail(dam_name: str):
             "priority": "CRITICAL",
             "details": {
                 "duration": "Sürekli",
-                "days_gained": round(days_pr - days_base, 1),
-                "retention_30d": round((vol_saved_pr / cap) * 100, 2),
-                "vol_saved_m3": round(vol_saved_pr),
+                **project_reduction(daily_out_base, usable, cap, days_base, 0.12),
                 "risk_label": "⚠️ Yüksek İrtifa Riski"
             }
         })
 
     elif status == "WARNING":
-        savings_pct_cut_8 = 0.20 
-        daily_out_cut_8 = daily_out_base * (1 - savings_pct_cut_8)
-        days_cut_8 = usable / daily_out_cut_8
-        vol_saved_cut_8 = (daily_out_base - daily_out_cut_8) * 30
         recs.append({
             "action": "PLANNED_CUTS_8H",
             "title": "KISMI SU KESİNTİSİ",
@@ -193,17 +274,11 @@ async def get_dam_detail(dam_name: str):
             "priority": "HIGH",
             "details": {
                 "duration": "Her Gün (8 Saat)",
-                "days_gained": round(days_cut_8 - days_base, 1),
-                "retention_30d": round((vol_saved_cut_8 / cap) * 100, 2),
-                "vol_saved_m3": round(vol_saved_cut_8),
+                **project_reduction(daily_out_base, usable, cap, days_base, 0.20),
                 "risk_label": "⚠️ Orta Tepki Riski"
             }
         })
 
-        savings_pct_pr_low = 0.06
-        daily_out_pr_low = daily_out_base * (1 - savings_pct_pr_low)
-        days_pr_low = usable / daily_out_pr_low
-        vol_saved_pr_low = (daily_out_base - daily_out_pr_low) * 30
         recs.append({
             "action": "PRESSURE_REDUCTION_LOW",
             "title": "HAFİF BASINÇ KISITLAMASI",
@@ -211,21 +286,17 @@ async def get_dam_detail(dam_name: str):
             "priority": "HIGH",
             "details": {
                 "duration": "Gece (00:00 - 06:00)",
-                "days_gained": round(days_pr_low - days_base, 1),
-                "retention_30d": round((vol_saved_pr_low / cap) * 100, 2),
-                "vol_saved_m3": round(vol_saved_pr_low),
+                **project_reduction(daily_out_base, usable, cap, days_base, 0.06),
             }
         })
 
-    connected = []
-    for dist, dams in ml_engine.district_to_dams.items():
-        if dam_name in dams: connected.append({"name": dist, "status": "SAFE"})
+    connected = [{"name": dist, "status": "SAFE"} for dist in ml_engine.dam_to_districts.get(dam_name, [])]
 
     return { 
         "dam": dam_name, 
         "occupancy_pct": occ, 
         "capacity_m3": cap, 
-        "volume_m3": cap * (occ/100), 
+        "volume_m3": stats['volume_m3'], 
         "status": status, 
         "days_to_crisis": round(days_base, 1), 
         "recommendations": recs, 
@@ -234,67 +305,74 @@ async def get_dam_detail(dam_name: str):
     }
 
 @app.get("/api/districts")
-async def get_districts():
+def get_districts(request: Request):
     if not ml_engine: return {"districts": []}
+    # Same inputs as /api/dams: static supply shares plus the month-dependent model
+    return cached_json_response(_districts_cache, request, _build_districts_payload)
+
+def _build_districts_payload():
+    monthly_cons = ml_engine.predict_all_districts_monthly(50.0)
+    daily_cons = monthly_cons / 30.0
+    days_supply = np.divide(district_supply_m3, daily_cons, out=np.zeros_like(district_supply_m3), where=daily_cons > 0)
+    statuses = get_supply_status_vec(days_supply)
+
     dist_summary = []
-    for dist in ml_engine.district_mapping.keys():
-        monthly_cons = ml_engine.predict_district_monthly_consumption(dist, 50.0)
-        daily_cons = monthly_cons / 30.0
-        sources = ml_engine.district_to_dams.get(dist, [])
-        source_details = []
-        total_supply_m3 = 0
-        for dam in sources:
-            if dam in ml_engine.dam_stats:
-                d_stats = ml_engine.dam_stats[dam]
-                usable = (d_stats['capacity_m3'] * (d_stats['occupancy_pct']/100)) * 0.95
-                total_supply_m3 += usable
-                source_details.append({"name": dam, "status": get_dam_status(d_stats['occupancy_pct'])})
-        effective_supply = total_supply_m3 / max(1, len(sources) * 2) 
-        days_supply = effective_supply / daily_cons if daily_cons > 0 else 0
-        status = "SAFE"
-        if days_supply < 30: status = "CRITICAL"
-        elif days_supply < 90: status = "WARNING"
-        elif days_supply < 180: status = "CAUTION"
-        
+    for dist, status, days, daily, source_details in zip(
+        district_names, statuses.tolist(), days_supply.tolist(), daily_cons.tolist(), district_source_dams
+    ):
         # USE REAL DRIVER FROM JSON
         driver = district_drivers.get(dist, "Residential (Est)")
         
-        dist_summary.append({ "name": dist, "status": status, "days_supply": round(days_supply), "daily_cons": round(daily_cons), "primary_driver": driver, "source_dams": source_details })
+        dist_summary.append({ "name": dist, "status": status, "days_supply": round(days), "daily_cons": round(daily), "primary_driver": driver, "source_dams": source_details })
     return {"districts": sorted(dist_summary, key=lambda x: x['days_supply'])}
 
+@app.get("/api/districts/assessment")
+def get_district_assessments():
+    if not ml_engine or not rules_engine: return {"districts": []}
+    occ_map = {name: stats['occupancy_pct'] for name, stats in ml_engine.dam_stats.items()}
+    districts = list(ml_engine.district_mapping.keys())
+    occs = [rules_engine.get_district_occupancy(d, occ_map) for d in districts]
+    cons = ml_engine.predict_all_districts_monthly(np.asarray(occs)).tolist()
+    assessments = rules_engine.generate_district_assessments(
+        districts, occs, cons, assessment_date=datetime.now().isoformat()
+    )
+    return {"districts": assessments}
+
 @app.get("/api/predictions/occupancy")
-async def get_occupancy_forecast():
+def get_occupancy_forecast():
     if not ml_engine: return {}
-    forecasts = {}
     today = datetime.now()
-    dates = [(today + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(30)]
-    for dam, stats in ml_engine.dam_stats.items():
-        cap = stats['capacity_m3']
-        current_vol = cap * (stats['occupancy_pct'] / 100.0)
-        daily_loss_m3 = ml_engine.get_dam_daily_outflow(dam)
-        trend = []
-        sim_vol = current_vol
-        for _ in range(30):
-            sim_vol -= daily_loss_m3
-            sim_vol = max(0, sim_vol)
-            pct = (sim_vol / cap) * 100
-            trend.append(round(pct, 2))
-        forecasts[dam] = trend
-    return {"dates": dates, "dams": forecasts}
+    # Deterministic in dam_stats and the date; rebuild once a day or on reload
+    if _forecast_cache["date"] != today.date():
+        dates = np.datetime_as_string(np.datetime64(today.date()) + np.arange(30)).tolist()
+        dams = ml_engine.dams
+        losses = ml_engine.get_dam_daily_outflows()
+        # Constant daily loss -> closed form over all dams x 30 days at once
+        days = np.arange(1, 31)
+        vols = np.maximum(dams.volume[:, None] - losses[:, None] * days[None, :], 0.0)
+        pct = np.round(vols / dams.capacity[:, None] * 100, 2)
+        body = orjson.dumps({
+            "dates": dates,
+            "dams": {dam: row.tolist() for dam, row in zip(dams.names, pct)}
+        })
+        _forecast_cache.update(date=today.date(), body=body)
+
+    return Response(_forecast_cache["body"], media_type="application/json")
 
 @app.get("/api/consumption/districts")
-async def get_consumption_rankings():
+def get_consumption_rankings():
     if not ml_engine: return []
-    data = []
-    for dist in ml_engine.district_mapping.keys():
-        monthly = ml_engine.predict_district_monthly_consumption(dist, 50.0)
-        data.append({ "district_name": dist, "avg_daily_m3": round(monthly / 30), "primary_driver": "Model Forecast" })
+    monthly = ml_engine.predict_all_districts_monthly(50.0).tolist()
+    data = [
+        { "district_name": dist, "avg_daily_m3": round(m / 30), "primary_driver": "Model Forecast" }
+        for dist, m in zip(ml_engine.district_mapping, monthly)
+    ]
     return sorted(data, key=lambda x: x['avg_daily_m3'], reverse=True)
 
 @app.get("/api/predictions/stats")
-async def get_stats():
+def get_stats():
     try:
-        with open(ROOT_DIR / 'models' / 'training_metrics.json', 'r') as f: return json.load(f)
+        return orjson.loads((ROOT_DIR / 'models' / 'training_metrics.json').read_bytes())
     except: return {"error": "Metrics not found"}
 
 if __name__ == "__main__":
@@ -3,12 +3,49 @@
 Effective Dam Management System - ML Inference Engine
 """
 
-import json
-import pickle
+import orjson
+import joblib
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 from datetime import datetime
 from pathlib import Path
 
+ARTIFACT_JSON = ('feature_names', 'district_mapping', 'district_to_dams', 'dam_stats')
+
+# Seasonal weather averages by month (row = month - 1), columns ordered like WEATHER_FEATURES
+WEATHER_FEATURES = ('temp_avg', 'temp_max', 'temp_min', 'humidity_avg', 'windspeed_avg')
+_WEATHER = np.array([
+    [5.8,  8.5,  3.2,  78, 18],
+    [6.2,  9.1,  3.5,  75, 19],
+    [8.5,  12.0, 5.1,  72, 17],
+    [13.2, 17.5, 9.2,  68, 15],
+    [18.5, 23.0, 14.1, 65, 14],
+    [23.5, 28.1, 18.5, 62, 16],
+    [26.2, 30.5, 21.2, 60, 19],
+    [26.5, 30.8, 21.5, 63, 18],
+    [22.1, 26.5, 17.8, 66, 16],
+    [17.5, 21.5, 13.5, 72, 15],
+    [12.5, 16.2, 9.1,  76, 16],
+    [8.1,  11.2, 5.2,  79, 18],
+], dtype=np.float64)
+_SEASON = np.array([1, 1, 2, 2, 2, 3, 3, 3, 4, 4, 4, 1])
+
+class DamArrays:
+    """Column (structure-of-arrays) view of dam_stats, indexed by position in `names`"""
+    def __init__(self, dam_stats):
+        self.names = list(dam_stats.keys())
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.capacity = self._column(dam_stats, 'capacity_m3')
+        self.occupancy = self._column(dam_stats, 'occupancy_pct')
+        self.volume = self._column(dam_stats, 'volume_m3')
+        self.usable = self._column(dam_stats, 'usable_m3')
+
+    def _column(self, dam_stats, field):
+        return np.fromiter((dam_stats[n][field] for n in self.names), dtype=np.float64, count=len(self.names))
+
+    def __len__(self):
+        return len(self.names)
+
 class RealPredictionEngine:
     def __init__(self, models_dir: str = 'models'):
         self.models_dir = Path(models_dir)
@@ -17,26 +54,61 @@ class RealPredictionEngine:
         
         self.load_artifacts()
         self.load_historical_baselines()
+        self._index_districts()
         
     def load_artifacts(self):
         try:
-            with open(self.models_dir / 'rf_consumption_model.pkl', 'rb') as f:
-                self.model = pickle.load(f)
-            with open(self.models_dir / 'scaler.pkl', 'rb') as f:
-                self.scaler = pickle.load(f)
-            with open(self.models_dir / 'feature_names.json', 'r') as f:
-                self.feature_names = json.load(f)
-            with open(self.models_dir / 'district_mapping.json', 'r') as f:
-                self.district_mapping = json.load(f)
-            with open(self.models_dir / 'district_to_dams.json', 'r') as f:
-                self.district_to_dams = json.load(f)
-            with open(self.models_dir / 'dam_stats.json', 'r') as f:
-                data = json.load(f)
-                self.dam_stats = data.get('today_stats', {})
+            # Independent files: overlap the reads instead of paying for them one by one
+            with ThreadPoolExecutor(max_workers=len(ARTIFACT_JSON) + 2) as pool:
+                model = pool.submit(self._load_estimator, 'rf_consumption_model')
+                scaler = pool.submit(self._load_estimator, 'scaler')
+                self.feature_names, self.district_mapping, self.district_to_dams, data = pool.map(
+                    self._load_json, ARTIFACT_JSON
+                )
+                self.model, self.scaler = model.result(), scaler.result()
+            self._feat_plan = self._build_feature_plan()
+            self.dam_to_districts = {}
+            for dist, dams in self.district_to_dams.items():
+                for dam in dams:
+                    self.dam_to_districts.setdefault(dam, []).append(dist)
+            self.district_source_count = {dist: len(dams) for dist, dams in self.district_to_dams.items()}
+            self.set_dam_stats(data.get('today_stats', {}))
         except FileNotFoundError as e:
             print(f"❌ Critical ML Artifact missing: {e}")
             raise
 
+    def _load_json(self, stem):
+        return orjson.loads((self.models_dir / f'{stem}.json').read_bytes())
+
+    def _load_estimator(self, stem):
+        """Memory-map a joblib dump so workers share the arrays; fall back to the legacy pickle"""
+        path = self.models_dir / f'{stem}.joblib'
+        if path.exists(): return joblib.load(path, mmap_mode='r')
+        return joblib.load(self.models_dir / f'{stem}.pkl')
+
+    def set_dam_stats(self, dam_stats):
+        """Replace dam stats and attach the derived volumes endpoints read"""
+        for stats in dam_stats.values():
+            cap = stats['capacity_m3']
+            stats['volume_m3'] = cap * (stats['occupancy_pct'] / 100.0)
+            stats['usable_m3'] = stats['volume_m3'] - cap * 0.03
+        self.dam_stats = dam_stats
+        self.dams = DamArrays(dam_stats)
+        self.dam_connected_counts = np.asarray(
+            [len(self.dam_to_districts.get(n, [])) for n in self.dams.names], dtype=np.int32
+        )
+        # (dams x districts) share of each district's daily draw, 1 / its number of sources;
+        # districts without a model mapping draw the flat 150k m³/month fallback
+        district_col = {dist: i for i, dist in enumerate(self.district_mapping)}
+        self._dam_share = np.zeros((len(self.dams), len(district_col)))
+        self._dam_fallback_outflow = np.zeros(len(self.dams))
+        for j, name in enumerate(self.dams.names):
+            for dist in self.dam_to_districts.get(name, []):
+                share = 1.0 / max(1, self.district_source_count[dist])
+                if dist in district_col: self._dam_share[j, district_col[dist]] = share
+                else: self._dam_fallback_outflow[j] += 150000.0 / 30.0 * share
+        self._outflow_cache = {"month": None, "values": None}
+
     def load_historical_baselines(self):
         self.district_baselines = {}
         try:
@@ -45,95 +117,90 @@ class RealPredictionEngine:
                 print(f"⚠️ Historical data not found at {file_path}. Using fallbacks.")
                 return
 
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-
-            fields = {item['id']: idx for idx, item in enumerate(data['fields'])}
-            totals = {}
-            counts = {}
-            
-            for row in data['records']:
-                for district_name, idx in fields.items():
-                    if idx < 2: continue 
-                    val = row[idx] if row[idx] is not None else 0
-                    totals[district_name] = totals.get(district_name, 0) + val
-                    counts[district_name] = counts.get(district_name, 0) + 1
-            
-            for dist, total in totals.items():
-                years = max(1, counts[dist])
-                self.district_baselines[dist] = (total / years) / 12.0
+            data = orjson.loads(file_path.read_bytes())
+
+            # First two columns are _id and Yil; missing readings count as 0
+            districts = [item['id'] for item in data['fields'][2:]]
+            if data['records']:
+                yearly = np.nan_to_num(np.array([row[2:] for row in data['records']], dtype=np.float64))
+                self.district_baselines = dict(zip(districts, (yearly.mean(axis=0) / 12.0).tolist()))
                 
             print(f"✅ Loaded historical baselines for {len(self.district_baselines)} districts.")
         except Exception as e:
             print(f"⚠️ Error calculating baselines: {e}")
 
-    def _get_seasonal_weather_averages(self, month):
-        weather_lookup = {
-            1:  {'temp_avg': 5.8,  'temp_max': 8.5,  'temp_min': 3.2, 'humidity_avg': 78, 'windspeed_avg': 18},
-            2:  {'temp_avg': 6.2,  'temp_max': 9.1,  'temp_min': 3.5, 'humidity_avg': 75, 'windspeed_avg': 19},
-            3:  {'temp_avg': 8.5,  'temp_max': 12.0, 'temp_min': 5.1, 'humidity_avg': 72, 'windspeed_avg': 17},
-            4:  {'temp_avg': 13.2, 'temp_max': 17.5, 'temp_min': 9.2, 'humidity_avg': 68, 'windspeed_avg': 15},
-            5:  {'temp_avg': 18.5, 'temp_max': 23.0, 'temp_min': 14.1,'humidity_avg': 65, 'windspeed_avg': 14},
-            6:  {'temp_avg': 23.5, 'temp_max': 28.1, 'temp_min': 18.5,'humidity_avg': 62, 'windspeed_avg': 16},
-            7:  {'temp_avg': 26.2, 'temp_max': 30.5, 'temp_min': 21.2,'humidity_avg': 60, 'windspeed_avg': 19},
-            8:  {'temp_avg': 26.5, 'temp_max': 30.8, 'temp_min': 21.5,'humidity_avg': 63, 'windspeed_avg': 18},
-            9:  {'temp_avg': 22.1, 'temp_max': 26.5, 'temp_min': 17.8,'humidity_avg': 66, 'windspeed_avg': 16},
-            10: {'temp_avg': 17.5, 'temp_max': 21.5, 'temp_min': 13.5,'humidity_avg': 72, 'windspeed_avg': 15},
-            11: {'temp_avg': 12.5, 'temp_max': 16.2, 'temp_min': 9.1, 'humidity_avg': 76, 'windspeed_avg': 16},
-            12: {'temp_avg': 8.1,  'temp_max': 11.2, 'temp_min': 5.2, 'humidity_avg': 79, 'windspeed_avg': 18},
-        }
-        return weather_lookup.get(month, weather_lookup[1])
+    def _index_districts(self):
+        """Per-district columns aligned with district_mapping order"""
+        n = len(self.district_mapping)
+        self.district_index = {dist: i for i, dist in enumerate(self.district_mapping)}
+        self.district_codes = np.fromiter(self.district_mapping.values(), dtype=np.float64, count=n)
+        self.district_baseline_arr = np.fromiter(
+            (self.district_baselines.get(dist, 250000.0) for dist in self.district_mapping), dtype=np.float64, count=n
+        )
+
+    def _current_conditions(self):
+        month = datetime.now().month
+        return _WEATHER[month - 1], int(_SEASON[month - 1])
+
+    def _build_feature_plan(self):
+        """Classify feature columns once as (kind, column index, payload); unmatched columns stay 0"""
+        plan = []
+        for idx, col_name in enumerate(self.feature_names):
+            if col_name in WEATHER_FEATURES: plan.append(('weather', idx, WEATHER_FEATURES.index(col_name)))
+            elif col_name == 'season': plan.append(('season', idx, None))
+            elif col_name == 'monthly_calls': plan.append(('const', idx, 50.0))
+            elif col_name == 'district_code': plan.append(('district_code', idx, None))
+            elif col_name in ('consumption_lag_1m', 'consumption_roll_3m'): plan.append(('historical', idx, None))
+            elif col_name in ('dam_occ_weighted', 'dam_occ_avg'): plan.append(('own_occ', idx, None))
+            elif col_name.endswith(('_dam_occ_weighted', '_dam_occ_avg')):
+                plan.append(('district_occ', idx, col_name.rsplit('_dam_occ_', 1)[0]))
+            elif '_occ_monthly' in col_name: plan.append(('dam_occ', idx, col_name.replace('_occ_monthly', '')))
+            elif '_precip_monthly' in col_name: plan.append(('const', idx, 40.0))
+        return plan
+
+    def _feature_matrix(self, districts, current_occ_pct):
+        """(len(districts), F) model input; each district only sees its own occupancy columns"""
+        weather, season = self._current_conditions()
+        occ = np.broadcast_to(np.asarray(current_occ_pct, dtype=np.float64), (len(districts),))
+        row_of = {dist: i for i, dist in enumerate(districts)}
+        pos = [self.district_index[d] for d in districts]
+        X = np.zeros((len(districts), len(self.feature_names)))
+        for kind, idx, payload in self._feat_plan:
+            if kind == 'weather': X[:, idx] = weather[payload]
+            elif kind == 'season': X[:, idx] = season
+            elif kind == 'const': X[:, idx] = payload
+            elif kind == 'dam_occ':
+                dam_i = self.dams.index.get(payload)
+                X[:, idx] = self.dams.occupancy[dam_i] if dam_i is not None else 0
+            elif kind == 'district_code': X[:, idx] = self.district_codes[pos]
+            elif kind == 'historical': X[:, idx] = self.district_baseline_arr[pos]
+            elif kind == 'own_occ': X[:, idx] = occ
+            elif kind == 'district_occ' and payload in row_of: X[row_of[payload], idx] = occ[row_of[payload]]
+        return X
 
     def predict_district_monthly_consumption(self, district_name, current_occ_pct):
         if district_name not in self.district_mapping: return 150000.0
-        today = datetime.now()
-        month = today.month
-        weather = self._get_seasonal_weather_averages(month)
-        
-        if month in [12, 1, 2]: season = 1
-        elif month in [3, 4, 5]: season = 2
-        elif month in [6, 7, 8]: season = 3
-        else: season = 4
-
-        historical_avg = self.district_baselines.get(district_name, 250000.0)
-
-        features = {}
-        features['temp_max'] = weather['temp_max']
-        features['temp_min'] = weather['temp_min']
-        features['temp_avg'] = weather['temp_avg']
-        features['humidity_avg'] = weather['humidity_avg']
-        features['windspeed_avg'] = weather['windspeed_avg']
-        features['district_code'] = self.district_mapping[district_name]
-        features['season'] = season
-        features['consumption_lag_1m'] = historical_avg 
-        features['consumption_roll_3m'] = historical_avg
-        features['monthly_calls'] = 50 
-        features[f'{district_name}_dam_occ_weighted'] = current_occ_pct
-        features[f'{district_name}_dam_occ_avg'] = current_occ_pct
-
-        ordered_values = []
-        for col_name in self.feature_names:
-            if col_name in features: val = features[col_name]
-            elif '_occ_monthly' in col_name:
-                dam_name = col_name.replace('_occ_monthly', '')
-                val = self.dam_stats.get(dam_name, {}).get('occupancy_pct', 0)
-            elif '_precip_monthly' in col_name: val = 40.0 
-            else: val = features.get(col_name, 0.0)
-            ordered_values.append(val)
-
-        input_array = np.array([ordered_values])
-        X_scaled = self.scaler.transform(input_array)
+        X_scaled = self.scaler.transform(self._feature_matrix([district_name], current_occ_pct))
         prediction_m3 = self.model.predict(X_scaled)[0]
         return max(10000, prediction_m3)
 
+    def predict_all_districts_monthly(self, current_occ_pct=50.0):
+        """Batched predict_district_monthly_consumption, ordered like district_mapping;
+        current_occ_pct may be a scalar or one value per district"""
+        X_scaled = self.scaler.transform(self._feature_matrix(list(self.district_mapping), current_occ_pct))
+        return np.maximum(10000, self.model.predict(X_scaled))
+
     def get_dam_daily_outflow(self, dam_name):
-        total_daily_outflow = 0
-        connected_districts = []
-        for dist, dams in self.district_to_dams.items():
-            if dam_name in dams: connected_districts.append(dist)
-        for dist in connected_districts:
-            monthly_pred = self.predict_district_monthly_consumption(dist, 50.0)
-            daily_pred = monthly_pred / 30.0
-            num_sources = len(self.district_to_dams[dist])
-            total_daily_outflow += (daily_pred / max(1, num_sources))
-        return total_daily_outflow
\ No newline at end of file
+        # A dam's share row is its connected-district mask weighted by 1 / num_sources
+        idx = self.dams.index.get(dam_name)
+        if idx is None: return 0.0
+        return float(self.get_dam_daily_outflows()[idx])
+
+    def get_dam_daily_outflows(self):
+        """Daily outflow (m³) for every dam, ordered like self.dams.names"""
+        month = datetime.now().month
+        if self._outflow_cache["month"] != month:
+            daily_preds = self.predict_all_districts_monthly(50.0) / 30.0
+            values = self._dam_share @ daily_preds + self._dam_fallback_outflow
+            self._outflow_cache.update(month=month, values=values)
+        return self._outflow_cache["values"]
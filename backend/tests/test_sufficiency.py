@@ -0,0 +1,81 @@
+"""
+Smoke tests: fastmath Numba sufficiency kernels vs the original pure-Python formula
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from action_rules_v1 import SUFFICIENCY_STATUS, _sufficiency_batch, _sufficiency_core
+
+
+def reference_sufficiency(occupancy_pct, predicted_monthly_consumption, precipitation_forecast):
+    """calculate_sufficiency_score as written before the Numba port"""
+    daily_consumption = predicted_monthly_consumption / 30
+    available_pct = max(occupancy_pct - 5.0, 0)
+    net_available_pct = available_pct + (precipitation_forecast * 0.5)
+    daily_loss_pct = (daily_consumption / 30) * 0.001
+
+    if daily_loss_pct > 0:
+        days_until_crisis = net_available_pct / (daily_loss_pct * 100)
+    else:
+        days_until_crisis = 999
+
+    model_confidence = min(90, 50 + (occupancy_pct * 0.4))
+    forecast_confidence = 70 if precipitation_forecast > 0 else 85
+    confidence = (model_confidence + forecast_confidence) / 2
+
+    if occupancy_pct < 15:
+        status = 'CRITICAL'
+        confidence = min(confidence, 95)
+    elif occupancy_pct < 30:
+        status = 'WARNING'
+    elif occupancy_pct < 50:
+        status = 'CAUTION'
+    else:
+        status = 'SAFE'
+
+    return (max(0, days_until_crisis), min(100, confidence), status,
+            available_pct, net_available_pct)
+
+
+# Threshold boundaries (15/30/50) and their neighbours, below the 5% margin, and the extremes
+OCCUPANCIES = [0.0, 2.5, 4.99, 5.0, 5.01, 14.99, 15.0, 15.01, 29.99, 30.0, 30.01,
+               49.99, 50.0, 50.01, 75.0, 100.0]
+CONSUMPTIONS = [0.0, 1.0, 1e3, 2.5e5, 1e6, 5e7]
+PRECIPITATIONS = [0.0, 0.1, 2.5, 20.0]
+
+GRID = [(o, c, p) for o in OCCUPANCIES for c in CONSUMPTIONS for p in PRECIPITATIONS]
+
+
+def assert_matches(result, expected):
+    days, confidence, status_code, available, net_available = result
+    exp_days, exp_confidence, exp_status, exp_available, exp_net_available = expected
+    assert SUFFICIENCY_STATUS[status_code] == exp_status
+    assert days == pytest.approx(exp_days, rel=1e-9)
+    assert confidence == pytest.approx(exp_confidence, rel=1e-9)
+    assert available == pytest.approx(exp_available, rel=1e-9, abs=1e-12)
+    assert net_available == pytest.approx(exp_net_available, rel=1e-9, abs=1e-12)
+
+
+@pytest.mark.parametrize('occupancy, consumption, precipitation', GRID)
+def test_core_matches_reference(occupancy, consumption, precipitation):
+    assert_matches(_sufficiency_core(occupancy, consumption, precipitation),
+                   reference_sufficiency(occupancy, consumption, precipitation))
+
+
+def test_batch_matches_reference():
+    occ, cons, precip = (np.array(col, dtype=np.float64) for col in zip(*GRID))
+    days, confidence, status, available, net_available = _sufficiency_batch(occ, cons, precip)
+    for i, args in enumerate(GRID):
+        assert_matches((days[i], confidence[i], status[i], available[i], net_available[i]),
+                       reference_sufficiency(*args))
+
+
+def test_zero_consumption_never_reaches_crisis():
+    days, *_ = _sufficiency_core(40.0, 0.0, 0.0)
+    assert days == 999.0